@@ -1,13 +1,29 @@
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.coder import Coder
+from fastapi_cache.decorator import cache
+from redis import asyncio as aioredis
+from pydantic import BaseModel
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, timezone
+import hmac
 import os
+import time
+import orjson
+import msgspec
 
 from portainer_client import init_portainer_client, get_portainer_client
+from state_store import MemoryStore, RedisStore
 
-app = FastAPI(title="Server Monitoring API", version="1.0.0")
+app = FastAPI(
+    title="Server Monitoring API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # CORS - Allow dashboard to connect
 app.add_middleware(
@@ -20,56 +36,65 @@ app.add_middleware(
 
 # Configuration
 API_KEY = os.getenv("API_KEY", "your-secret-api-key-change-in-production")
+API_KEY_BYTES = API_KEY.encode()
 STALE_THRESHOLD_SECONDS = int(os.getenv("STALE_THRESHOLD_SECONDS", "300"))
 
+# Response cache for dashboard polling endpoints
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHE_PREFIX = "nexus"
+CACHE_NAMESPACE = "monitoring"
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "2"))
+# Lets reverse proxies (nginx/Cloudflare) coalesce polls across clients
+POLL_HEADERS = {"Cache-Control": f"public, max-age={CACHE_TTL_SECONDS}"}
+
 # Portainer Configuration
 PORTAINER_URL = os.getenv("PORTAINER_URL", "")
 PORTAINER_API_KEY = os.getenv("PORTAINER_API_KEY", "")
+PORTAINER_MAX_CONNECTIONS = int(os.getenv("PORTAINER_MAX_CONNECTIONS", "1000"))
 
-# In-memory storage (use Redis/PostgreSQL for production)
-server_data: Dict[str, dict] = {}
-machine_registry: Dict[str, dict] = {}
+# Server state: in-process by default, shared through Redis when REDIS_URL is set
+store: Union[MemoryStore, RedisStore] = MemoryStore()
 
 # ==================== DATA MODELS ====================
 
-class LoadAvg(BaseModel):
-    one_min: float = Field(alias="1m")
-    five_min: float = Field(alias="5m")
-    fifteen_min: float = Field(alias="15m")
+# Report payloads are decoded with msgspec (C-level JSON -> struct, no
+# intermediate dicts). Pydantic is kept for low-volume request bodies.
 
-    class Config:
-        populate_by_name = True
+class LoadAvg(msgspec.Struct):
+    one_min: float = msgspec.field(name="1m")
+    five_min: float = msgspec.field(name="5m")
+    fifteen_min: float = msgspec.field(name="15m")
 
-class CPU(BaseModel):
+class CPU(msgspec.Struct):
     percent: float
     loadavg: LoadAvg
 
-class Memory(BaseModel):
+class Memory(msgspec.Struct):
     total_gb: float
     used_gb: float
     percent: float
 
-class Disk(BaseModel):
+class Disk(msgspec.Struct):
     mountpoint: str
     fstype: str
     free_gb: float
     total_gb: float
     percent: float
 
-class LoggedUser(BaseModel):
+class LoggedUser(msgspec.Struct):
     name: str
     tty: str
     host: str
     started: str
 
-class GPUProcess(BaseModel):
+class GPUProcess(msgspec.Struct):
     pid: int
     username: str
     cmd: str
     used_memory_mb: int
     type: Optional[str] = None  # Process type (C for compute, G for graphics)
 
-class GPU(BaseModel):
+class GPU(msgspec.Struct):
     index: int
     name: str
     utilization_pct: float
@@ -80,7 +105,7 @@ class GPU(BaseModel):
     power_draw_watts: Optional[float] = None
     processes: List[GPUProcess] = []
 
-class Container(BaseModel):
+class Container(msgspec.Struct):
     id: str
     name: str
     image: str
@@ -90,7 +115,7 @@ class Container(BaseModel):
     cpu_pct: float = 0.0
     mem_mb: int = 0
 
-class ServerReport(BaseModel):
+class ServerReport(msgspec.Struct, kw_only=True):
     server_alias: str
     hostname: str
     ip: str
@@ -109,7 +134,7 @@ class ServerReport(BaseModel):
     os: str = "Unknown"
     labels: List[str] = []
 
-class ServerStatus(BaseModel):
+class ServerStatus(msgspec.Struct, kw_only=True):
     server_alias: str
     status: str  # "ok" or "down"
     hostname: str
@@ -122,7 +147,7 @@ class ServerStatus(BaseModel):
     gpus: List[GPU]
     timestamp: str
 
-class Machine(BaseModel):
+class Machine(msgspec.Struct, kw_only=True):
     id: str
     alias: str
     type: str  # host, container
@@ -133,21 +158,133 @@ class Machine(BaseModel):
     labels: List[str]
     status: str  # online, offline, degraded
 
+# strict=False mirrors Pydantic's lax coercion (e.g. 3.0 -> int, "5" -> int)
+report_decoder = msgspec.json.Decoder(ServerReport, strict=False)
+
 # ==================== HELPER FUNCTIONS ====================
 
-def is_server_stale(last_update: str) -> bool:
-    """Check if server data is stale (older than threshold)"""
-    try:
-        # Parse ISO timestamp with timezone
-        last_update_time = datetime.fromisoformat(last_update.replace("Z", "+00:00"))
-        # Get current time in UTC
-        now = datetime.now(timezone.utc)
-        # Calculate age in seconds (both are timezone-aware)
-        age = (now - last_update_time).total_seconds()
-        return age > STALE_THRESHOLD_SECONDS
-    except Exception as e:
-        print(f"Error parsing timestamp {last_update}: {e}")
-        return True
+def cache_key_builder(
+    func,
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: tuple = (),
+    kwargs: Optional[dict] = None,
+) -> str:
+    """Build cache key from path + query only (ignores Authorization header)"""
+    if request is None:
+        return f"{namespace}:{func.__module__}:{func.__name__}"
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.items()))
+    return f"{namespace}:{request.url.path}?{query}"
+
+class ResponseCoder(Coder):
+    """Cache prebuilt JSON responses as raw bytes"""
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        return value.body
+
+    @classmethod
+    def decode(cls, value: bytes) -> Response:
+        return Response(content=value, media_type="application/json", headers=POLL_HEADERS)
+
+async def invalidate_response_cache() -> None:
+    """Drop cached polling responses so mutations are immediately visible"""
+    await FastAPICache.clear(namespace=CACHE_NAMESPACE)
+
+def build_status_view(report: ServerReport) -> dict:
+    """Build the /api/status entry for a server (status assumed "ok")"""
+    return {
+        "server_alias": report.server_alias,
+        "status": "ok",
+        "hostname": report.hostname,
+        "ip": report.ip,
+        "uptime_seconds": report.uptime_seconds,
+        "cpu": msgspec.to_builtins(report.cpu),
+        "memory": msgspec.to_builtins(report.memory),
+        "disks": msgspec.to_builtins(report.disks),
+        "users": msgspec.to_builtins(report.users),
+        "gpus": msgspec.to_builtins(report.gpus),
+        "timestamp": report.timestamp,
+        "os": report.os
+    }
+
+def build_host_view(report: ServerReport) -> dict:
+    """Build the /api/hosts entry for a server (status assumed "online")"""
+    return {
+        "alias": report.server_alias,
+        "hostname": report.hostname,
+        "ip": report.ip,
+        "status": "online"
+    }
+
+def build_machine_view(report: ServerReport) -> dict:
+    """Build the /api/machines entry for the reporting machine itself"""
+    return {
+        "id": report.server_alias,
+        "alias": report.server_alias,
+        "type": report.machine_type,
+        "group": report.group,
+        "parent": None,
+        "ip": report.ip,
+        "os": report.os,
+        "labels": report.labels,
+        "status": "online"
+    }
+
+def build_container_machine_view(report: ServerReport, container: Container) -> dict:
+    """Build the /api/machines entry for a container on the reporting host"""
+    return {
+        "id": f"{report.server_alias}-{container.name}",
+        "alias": container.name,
+        "type": "container",
+        "group": report.group,
+        "parent": report.server_alias,
+        "ip": report.ip,
+        "os": container.image,
+        "labels": ["container", container.state],
+        "status": "online" if container.state == "running" else "offline"
+    }
+
+def build_report_blobs(report: ServerReport) -> Dict[str, bytes]:
+    """
+    Prebuild every JSON fragment the polling endpoints serve for a report.
+    Fresh and stale variants are both encoded so reads never re-encode.
+    Empty blobs mean "nothing to emit" for that field.
+    """
+    status_view = build_status_view(report)
+    machine_view = build_machine_view(report)
+    machine_blob = orjson.dumps(machine_view)
+
+    blobs = {
+        "status": orjson.dumps(status_view),
+        "status_down": orjson.dumps({**status_view, "status": "down"}),
+        "host": b"",
+        "host_offline": b"",
+        "machine": machine_blob,
+        "machine_offline": machine_blob,
+        "children": b",".join(
+            orjson.dumps(build_container_machine_view(report, container))
+            for container in report.containers
+        ),
+        "containers": msgspec.json.encode(report.containers),
+    }
+
+    # Only hosts are listed in /api/hosts and have their machine status
+    # tracked by report freshness
+    if report.machine_type == "host":
+        host_view = build_host_view(report)
+        blobs["host"] = orjson.dumps(host_view)
+        blobs["host_offline"] = orjson.dumps({**host_view, "status": "offline"})
+        blobs["machine_offline"] = orjson.dumps({**machine_view, "status": "offline"})
+
+    return blobs
+
+def json_list_response(key: str, blobs: List[bytes]) -> Response:
+    """Wrap prebuilt JSON blobs into a {key: [...]} response"""
+    content = b'{"' + key.encode() + b'":[' + b",".join(blobs) + b"]}"
+    return Response(content=content, media_type="application/json", headers=POLL_HEADERS)
 
 def verify_api_key(authorization: Optional[str] = None) -> bool:
     """Verify API key from Authorization header"""
@@ -155,8 +292,8 @@ def verify_api_key(authorization: Optional[str] = None) -> bool:
         return False
 
     # Support both "Bearer TOKEN" and just "TOKEN"
-    token = authorization.replace("Bearer ", "").strip()
-    return token == API_KEY
+    token = authorization[7:] if authorization.startswith("Bearer ") else authorization
+    return hmac.compare_digest(token.strip().encode(), API_KEY_BYTES)
 
 # ==================== ENDPOINTS ====================
 
@@ -166,13 +303,13 @@ async def root():
     return {
         "service": "Server Monitoring API",
         "status": "online",
-        "servers_monitored": len(server_data),
+        "servers_monitored": await store.count(),
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
 @app.post("/api/report")
 async def receive_report(
-    report: ServerReport,
+    request: Request,
     authorization: str = Header(None)
 ):
     """
@@ -183,128 +320,68 @@ async def receive_report(
     if not verify_api_key(authorization):
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
 
-    server_alias = report.server_alias
-
-    # Store server data
-    server_data[server_alias] = {
-        **report.model_dump(),
-        "received_at": datetime.now(timezone.utc).isoformat(),
-        "status": "ok"
-    }
+    try:
+        report = report_decoder.decode(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid report: {str(e)}")
 
-    # Update machine registry
-    machine_registry[server_alias] = {
-        "id": server_alias,
-        "alias": server_alias,
-        "type": report.machine_type,
-        "group": report.group,
-        "parent": None,
-        "ip": report.ip,
-        "os": report.os,
-        "labels": report.labels,
-        "status": "online"
-    }
+    server_alias = report.server_alias
+    now_ts = time.time()
 
-    # Register containers as machines if present
-    for container in report.containers:
-        container_id = f"{server_alias}-{container.name}"
-        machine_registry[container_id] = {
-            "id": container_id,
-            "alias": container.name,
-            "type": "container",
-            "group": report.group,
-            "parent": server_alias,
-            "ip": report.ip,
-            "os": container.image,
-            "labels": ["container", container.state],
-            "status": "online" if container.state == "running" else "offline"
-        }
+    # Precompute read-side payloads so polling endpoints only copy bytes
+    await store.save(server_alias, now_ts, build_report_blobs(report))
+    await invalidate_response_cache()
 
     return {
         "status": "ok",
         "server_alias": server_alias,
-        "received_at": server_data[server_alias]["received_at"]
+        "received_at": datetime.fromtimestamp(now_ts, timezone.utc).isoformat()
     }
 
 @app.get("/api/status")
+@cache(expire=CACHE_TTL_SECONDS, namespace=CACHE_NAMESPACE, coder=ResponseCoder)
 async def get_status():
     """
     Get status of all monitored servers.
     Used by dashboard for real-time monitoring.
     """
-    results = []
-
-    for _, data in server_data.items():
-        # Check if data is stale
-        if is_server_stale(data["received_at"]):
-            data["status"] = "down"
-        else:
-            data["status"] = "ok"
-
-        # Build response matching frontend expectations
-        results.append({
-            "server_alias": data["server_alias"],
-            "status": data["status"],
-            "hostname": data["hostname"],
-            "ip": data["ip"],
-            "uptime_seconds": data["uptime_seconds"],
-            "cpu": data["cpu"],
-            "memory": data["memory"],
-            "disks": data["disks"],
-            "users": data["users"],
-            "gpus": data["gpus"],
-            "timestamp": data["timestamp"],
-            "os": data.get("os", "Unknown")
-        })
-
-    return {"results": results}
+    blobs = await store.select(
+        ("status",), ("status_down",), time.time(), STALE_THRESHOLD_SECONDS
+    )
+    return json_list_response("results", blobs)
 
 @app.get("/api/machines")
+@cache(expire=CACHE_TTL_SECONDS, namespace=CACHE_NAMESPACE, coder=ResponseCoder)
 async def get_machines():
     """
     Get inventory of all machines (hosts + containers).
     """
-    machines = []
-
-    for machine_id, data in machine_registry.items():
-        # Update status based on latest server data
-        if data["type"] == "host" and machine_id in server_data:
-            if is_server_stale(server_data[machine_id]["received_at"]):
-                data["status"] = "offline"
-            else:
-                data["status"] = "online"
-
-        machines.append(data)
-
-    return {"machines": machines}
+    blobs = await store.select(
+        ("machine", "children"), ("machine_offline", "children"), time.time(), STALE_THRESHOLD_SECONDS
+    )
+    return json_list_response("machines", blobs)
 
 @app.get("/api/docker/{host}/containers")
 async def get_containers(host: str):
     """
     Get containers running on a specific host.
     """
-    if host not in server_data:
+    containers = await store.get(host, "containers")
+    if containers is None:
         raise HTTPException(status_code=404, detail=f"Host '{host}' not found")
 
-    containers = server_data[host].get("containers", [])
-    return containers
+    return Response(content=containers, media_type="application/json")
 
 @app.get("/api/hosts")
+@cache(expire=CACHE_TTL_SECONDS, namespace=CACHE_NAMESPACE, coder=ResponseCoder)
 async def get_hosts():
     """
     Get list of all monitored hosts (for dropdown selectors).
     """
-    hosts = [
-        {
-            "alias": alias,
-            "hostname": data["hostname"],
-            "ip": data["ip"],
-            "status": "online" if not is_server_stale(data["received_at"]) else "offline"
-        }
-        for alias, data in server_data.items()
-        if data.get("machine_type", "host") == "host"
-    ]
-    return {"hosts": hosts}
+    blobs = await store.select(
+        ("host",), ("host_offline",), time.time(), STALE_THRESHOLD_SECONDS
+    )
+    return json_list_response("hosts", blobs)
 
 @app.delete("/api/server/{alias}")
 async def delete_server(alias: str, authorization: str = Header(None)):
@@ -314,17 +391,11 @@ async def delete_server(alias: str, authorization: str = Header(None)):
     if not verify_api_key(authorization):
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
 
-    if alias not in server_data:
-        raise HTTPException(status_code=404, detail=f"Server '{alias}' not found")
-
     # Remove server and its containers
-    del server_data[alias]
+    if not await store.delete(alias):
+        raise HTTPException(status_code=404, detail=f"Server '{alias}' not found")
 
-    # Remove from machine registry
-    to_remove = [mid for mid, data in machine_registry.items()
-                 if mid == alias or data.get("parent") == alias]
-    for mid in to_remove:
-        del machine_registry[mid]
+    await invalidate_response_cache()
 
     return {"status": "ok", "message": f"Server '{alias}' removed"}
 
@@ -344,7 +415,7 @@ async def portainer_status():
         raise HTTPException(status_code=503, detail=f"Portainer connection failed: {str(e)}")
 
 @app.get("/api/portainer/endpoints")
-async def get_portainer_endpoints():
+async def get_portainer_endpoints(response: Response):
     """Get all Portainer endpoints (environments)"""
     client = get_portainer_client()
     if not client:
@@ -352,12 +423,39 @@ async def get_portainer_endpoints():
 
     try:
         endpoints = await client.get_endpoints()
+        if client.is_stale("get_endpoints"):
+            response.headers["X-Cache"] = "STALE"
         return {"endpoints": endpoints}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch endpoints: {str(e)}")
 
+@app.get("/api/portainer/endpoints/{endpoint_id}/containers")
+async def get_portainer_endpoint_containers(endpoint_id: int):
+    """Get the containers on a Portainer endpoint as parallel id/name/state/image lists"""
+    client = get_portainer_client()
+    if not client:
+        raise HTTPException(status_code=503, detail="Portainer not configured")
+
+    try:
+        return await client.get_endpoint_containers_slim(endpoint_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch containers: {str(e)}")
+
+@app.get("/api/portainer/overview")
+async def get_portainer_overview():
+    """Get all Portainer endpoints with their containers in one request"""
+    client = get_portainer_client()
+    if not client:
+        raise HTTPException(status_code=503, detail="Portainer not configured")
+
+    try:
+        overview = await client.snapshot_all()
+        return {"overview": overview}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch overview: {str(e)}")
+
 @app.get("/api/portainer/templates")
-async def get_portainer_templates():
+async def get_portainer_templates(response: Response):
     """Get all custom templates from Portainer"""
     client = get_portainer_client()
     if not client:
@@ -365,25 +463,27 @@ async def get_portainer_templates():
 
     try:
         templates = await client.get_custom_templates()
+        if client.is_stale("get_custom_templates"):
+            response.headers["X-Cache"] = "STALE"
         return {"templates": templates}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch templates: {str(e)}")
 
 @app.get("/api/portainer/templates/{template_id}")
-async def get_portainer_template(template_id: int):
-    """Get specific template details including variables"""
+async def get_portainer_template(template_id: int, include_vars: bool = False):
+    """Get specific template details, including variables if include_vars"""
     client = get_portainer_client()
     if not client:
         raise HTTPException(status_code=503, detail="Portainer not configured")
 
     try:
-        template = await client.get_custom_template(template_id)
+        template = await client.get_custom_template(template_id, include_vars=include_vars)
         return template
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch template: {str(e)}")
 
 @app.get("/api/portainer/stacks")
-async def get_portainer_stacks():
+async def get_portainer_stacks(response: Response):
     """Get all deployed stacks"""
     client = get_portainer_client()
     if not client:
@@ -391,6 +491,8 @@ async def get_portainer_stacks():
 
     try:
         stacks = await client.get_stacks()
+        if client.is_stale("get_stacks"):
+            response.headers["X-Cache"] = "STALE"
         return {"stacks": stacks}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch stacks: {str(e)}")
@@ -456,9 +558,20 @@ async def startup_event():
     print(f"⏱️  Stale threshold: {STALE_THRESHOLD_SECONDS}s")
     print(f"🌐 CORS: Enabled for all origins (change in production!)")
 
+    # Initialize state store and response cache (Redis if configured, in-process otherwise)
+    if REDIS_URL:
+        global store
+        redis = aioredis.from_url(REDIS_URL)
+        store = RedisStore(redis, prefix=CACHE_PREFIX, record_ttl=STALE_THRESHOLD_SECONDS * 4)
+        FastAPICache.init(RedisBackend(redis), prefix=CACHE_PREFIX, key_builder=cache_key_builder)
+        print(f"🗄️  State + cache: Redis at {REDIS_URL} (TTL {CACHE_TTL_SECONDS}s)")
+    else:
+        FastAPICache.init(InMemoryBackend(), prefix=CACHE_PREFIX, key_builder=cache_key_builder)
+        print(f"🗄️  State + cache: In-memory (TTL {CACHE_TTL_SECONDS}s)")
+
     # Initialize Portainer client if configured
     if PORTAINER_URL and PORTAINER_API_KEY:
-        init_portainer_client(PORTAINER_URL, PORTAINER_API_KEY)
+        init_portainer_client(PORTAINER_URL, PORTAINER_API_KEY, max_connections=PORTAINER_MAX_CONNECTIONS)
         client = get_portainer_client()
         if client:
             is_healthy = await client.health_check()
@@ -473,6 +586,24 @@ async def startup_event():
 
     print("=" * 60)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Close pooled Portainer connections instead of leaving them to GC
+    client = get_portainer_client()
+    if client:
+        await client.close()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    # Multiple workers only share state through Redis; in-process state
+    # would be split between workers, so default to one without it
+    default_workers = (os.cpu_count() or 1) if REDIS_URL else 1
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WORKERS", str(default_workers))),
+        loop="uvloop",
+        http="httptools"
+    )
@@ -3,40 +3,374 @@ Portainer API Client
 Handles authentication and API calls to Portainer
 """
 
+import asyncio
+import functools
+import re
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 import httpx
-from typing import List, Dict, Optional, Any
+import orjson
+from typing import List, Dict, Optional, Any, Awaitable, Callable, Iterator, Set, Tuple, Union
+
+# Parsed custom template files are reused for this many seconds
+TEMPLATE_CACHE_TTL = 60.0
+
+# Seconds a health_check result is reused
+HEALTH_CACHE_TTL = 3.0
+
+# Max concurrent upstream requests issued by a single fan-out helper
+FANOUT_CONCURRENCY = 50
+
+# {{VARIABLE_NAME}} placeholders substituted at deploy time
+PLACEHOLDER_PATTERN = re.compile(r"\{\{([^{}]+)\}\}")
+
+# Endpoint/stack detail lookups: max entries kept and seconds each is reused
+DETAIL_CACHE_SIZE = 512
+ENDPOINT_DETAIL_TTL = 30.0
+STACK_DETAIL_TTL = 15.0
+
+# Env payload reused for deployments without variables
+_EMPTY_ENV: List[Dict[str, str]] = []
+
+
+def _cache_key(name: str, args: tuple, kwargs: Dict[str, Any]) -> str:
+    """Build a cache key from a method name and its arguments, e.g. get_endpoint:3"""
+    parts = [name, *map(str, args), *(f"{k}={v}" for k, v in sorted(kwargs.items()))]
+    return ":".join(parts)
+
+
+def ttl_cache(seconds: float, stale_seconds: float = 0.0):
+    """
+    Cache a PortainerClient GET method per arguments through PortainerClient._cached
+
+    Args:
+        seconds: Seconds the result is considered fresh
+        stale_seconds: Extra seconds a stale result may be served while revalidating
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            key = _cache_key(fn.__name__, args, kwargs)
+            return await self._cached(
+                key, seconds, lambda: fn(self, *args, **kwargs), stale_ttl=stale_seconds
+            )
+        return wrapper
+    return decorator
+
+
+def _ok(response: httpx.Response) -> httpx.Response:
+    """Return response if successful, otherwise raise httpx.HTTPStatusError"""
+    if not response.is_success:
+        response.raise_for_status()
+    return response
+
+
+# Connection pools shared by every client for the same (url, verify) pair
+_shared_clients: Dict[Tuple[str, bool], httpx.AsyncClient] = {}
+_shared_refcounts: Dict[Tuple[str, bool], int] = {}
+
+
+def _acquire_shared_client(key: Tuple[str, bool], max_connections: int) -> httpx.AsyncClient:
+    """
+    Get the pooled AsyncClient for a Portainer host, creating it if needed
+
+    Args:
+        key: (url, verify) pool key
+        max_connections: Connection pool ceiling, applied when the pool is created
+
+    Returns:
+        httpx.AsyncClient: Shared client without auth headers
+    """
+    client = _shared_clients.get(key)
+    if client is None or client.is_closed:
+        _, verify = key
+
+        # Pooled HTTP/2 transport; verify is False for self-signed certs
+        # Retries cover transient connection resets during deploy stampedes
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            verify=verify,
+            retries=2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=100,
+                keepalive_expiry=30.0
+            )
+        )
+
+        # Read timeout set to 10 minutes for large image pulls during deployment
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(connect=5.0, read=600.0, write=30.0, pool=5.0)
+        )
+        _shared_clients[key] = client
+        _shared_refcounts[key] = 0
+
+    _shared_refcounts[key] += 1
+    return client
+
+
+async def _release_shared_client(key: Tuple[str, bool], client: httpx.AsyncClient) -> None:
+    """Drop one reference to a shared pool and close it when unused"""
+    if _shared_clients.get(key) is not client:
+        # Pool was already replaced (e.g. after being closed); close our copy
+        await client.aclose()
+        return
+
+    _shared_refcounts[key] -= 1
+    if _shared_refcounts[key] <= 0:
+        del _shared_clients[key]
+        del _shared_refcounts[key]
+        await client.aclose()
+
+
+@dataclass(slots=True)
+class DashboardSnapshot:
+    """
+    Results of the dashboard's initial calls, fetched concurrently
+
+    Each field holds either the call's result or the exception it raised,
+    so one failing call does not hide the others.
+    """
+    status: Union[Dict[str, Any], BaseException]
+    endpoints: Union[List[Dict[str, Any]], BaseException]
+    stacks: Union[List[Dict[str, Any]], BaseException]
+    templates: Union[List[Dict[str, Any]], BaseException]
 
 
 class PortainerClient:
     """Client for interacting with Portainer API"""
 
-    def __init__(self, url: str, api_key: str):
+    def __init__(self, url: str, api_key: str, max_connections: int = 1000):
         """
         Initialize Portainer client
 
         Args:
             url: Portainer server URL (e.g., https://portainer.example.com:9443)
             api_key: API access token (ptr_xxxxx)
+            max_connections: Connection pool ceiling for concurrent requests
         """
         self.url = url.rstrip('/')
         self.api_key = api_key
         self.base_url = f"{self.url}/api"
 
-        # Create httpx client with SSL verification disabled for self-signed certs
-        # Timeout set to 10 minutes for large image pulls during deployment
-        self.client = httpx.AsyncClient(
-            verify=False,
-            timeout=600.0,  # 10 minutes for image pulls
-            headers={
-                "X-API-Key": self.api_key,
-                "Content-Type": "application/json"
-            }
-        )
+        # URL templates built once; methods fill them with the % operator
+        self._u_status = f"{self.base_url}/status"
+        self._u_endpoints = f"{self.base_url}/endpoints"
+        self._u_ep = self.base_url + "/endpoints/%d"
+        self._u_ep_containers = self.base_url + "/endpoints/%d/docker/containers/json?all=true"
+        self._u_ep_container_create = self.base_url + "/endpoints/%d/docker/containers/create"
+        self._u_ep_container_start = self.base_url + "/endpoints/%d/docker/containers/%s/start"
+        self._u_tmpls = f"{self.base_url}/custom_templates"
+        self._u_tmpl = self.base_url + "/custom_templates/%d"
+        self._u_tmpl_file = self.base_url + "/custom_templates/%d/file"
+        self._u_stacks = f"{self.base_url}/stacks"
+        self._u_stack = self.base_url + "/stacks/%d"
+        self._u_stack_on_ep = self.base_url + "/stacks/%d?endpointId=%d"
+        self._u_deploy_swarm = self.base_url + "/stacks/create/swarm/string?endpointId=%d"
+        self._u_deploy_compose = self.base_url + "/stacks/create/standalone/string?endpointId=%d"
+
+        # Auth goes on each request rather than on the client, so clients
+        # for the same Portainer host can share one connection pool
+        self._headers = {
+            "X-API-Key": self.api_key,
+            "Accept": "application/json"
+        }
+        # Content-Type is only sent with bodies encoded by hand (json= sets its own)
+        self._json_headers = {**self._headers, "Content-Type": "application/json"}
+        self._pool_key = (self.url, False)
+        self.client = _acquire_shared_client(self._pool_key, max_connections)
+        self._closed = False
+
+        # Short-lived response cache with per-key single-flight locks
+        # Entries are (fresh_until, hard_until, value) on the monotonic clock
+        self._cache: Dict[str, Tuple[float, float, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._prewarm_task: Optional[asyncio.Task] = None
+        self._last_health = False
+        self._last_health_ts = float("-inf")
+
+        # Bounds fan-out so requests don't queue up inside the httpx pool
+        self._fanout = asyncio.Semaphore(min(FANOUT_CONCURRENCY, max_connections))
+        self._tpl_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+
+        # Bounded LRU for per-id detail lookups; entries are (fetched_at, value)
+        self._detail_cache: "OrderedDict[Tuple[str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
 
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Release the HTTP client, closing the pool once no client uses it"""
+        if self._closed:
+            return
+        self._closed = True
+        await _release_shared_client(self._pool_key, self.client)
+
+    async def __aenter__(self) -> "PortainerClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def prewarm(self) -> None:
+        """Open the pooled connection (TCP + TLS) and fill the dashboard caches"""
+        snapshot = await self.refresh_dashboard()
+        for name in DashboardSnapshot.__slots__:
+            value = getattr(snapshot, name)
+            if isinstance(value, BaseException):
+                print(f"Warning: Portainer prewarm of {name} failed: {value}")
 
+    @staticmethod
+    def _json(response: httpx.Response) -> Any:
+        """Decode a JSON response body with orjson"""
+        return orjson.loads(response.content)
+
+    async def _cached(
+        self,
+        key: str,
+        ttl: float,
+        fn: Callable[[], Awaitable[Any]],
+        stale_ttl: float = 0.0
+    ) -> Any:
+        """
+        Return cached value for key, fetching it from Portainer when expired
+        Concurrent callers for the same key share a single upstream request
+
+        Within ttl the cached value is returned as-is. For a further stale_ttl
+        seconds the cached value is still returned while a background refresh
+        runs. Past that the value is refetched, and the last known value is
+        served if Portainer fails.
+
+        Args:
+            key: Cache key
+            ttl: Seconds the value is considered fresh
+            fn: Coroutine function performing the upstream request
+            stale_ttl: Extra seconds a stale value may be served while revalidating
+
+        Returns:
+            Any: Cached or freshly fetched value
+        """
+        entry = self._cache.get(key)
+        if entry:
+            fresh_until, hard_until, value = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                return value
+            if now < hard_until:
+                self._schedule_refresh(key, ttl, fn, stale_ttl)
+                return value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another caller may have refreshed the entry while we waited
+            entry = self._cache.get(key)
+            if entry and time.monotonic() < entry[0]:
+                return entry[2]
+
+            try:
+                return await self._refresh(key, ttl, fn, stale_ttl)
+            except Exception:
+                # Fall back to the last known value if we have one
+                if entry:
+                    return entry[2]
+                raise
+
+    async def _refresh(
+        self,
+        key: str,
+        ttl: float,
+        fn: Callable[[], Awaitable[Any]],
+        stale_ttl: float
+    ) -> Any:
+        """Fetch a value and store it with its fresh/stale deadlines"""
+        value = await fn()
+        now = time.monotonic()
+        self._cache[key] = (now + ttl, now + ttl + stale_ttl, value)
+        return value
+
+    def _schedule_refresh(
+        self,
+        key: str,
+        ttl: float,
+        fn: Callable[[], Awaitable[Any]],
+        stale_ttl: float
+    ) -> None:
+        """Start a background refresh for key unless one is already running"""
+        if key in self._refreshing:
+            return
+
+        async def run():
+            try:
+                async with self._locks.setdefault(key, asyncio.Lock()):
+                    entry = self._cache.get(key)
+                    if entry and time.monotonic() < entry[0]:
+                        return
+                    await self._refresh(key, ttl, fn, stale_ttl)
+            except Exception as e:
+                print(f"Warning: Background refresh of {key} failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(run())
+
+    def is_stale(self, key: str) -> bool:
+        """
+        Check whether the cached value for key is past its fresh window
+
+        Args:
+            key: Cache key (e.g. "get_endpoints", "get_custom_templates", "get_stacks")
+
+        Returns:
+            bool: True if the last returned value for key was served stale
+        """
+        entry = self._cache.get(key)
+        return bool(entry) and time.monotonic() >= entry[0]
+
+    def invalidate(self, *prefixes: str) -> None:
+        """
+        Expire cached entries whose key starts with any of the prefixes,
+        keeping their values as a failure fallback
+
+        Args:
+            prefixes: Key prefixes, e.g. "get_stack" covers get_stacks and get_stack:<id>
+        """
+        for key, entry in self._cache.items():
+            if key.startswith(prefixes):
+                self._cache[key] = (0.0, 0.0, entry[2])
+
+    def _lru_get(self, kind: str, id_: int, ttl: float) -> Optional[Dict[str, Any]]:
+        """
+        Look up a detail entry, marking it most recently used
+
+        Args:
+            kind: Entry kind ("endpoint" or "stack")
+            id_: Object ID
+            ttl: Seconds an entry stays valid
+
+        Returns:
+            dict: Cached value, or None if missing or expired
+        """
+        key = (kind, id_)
+        entry = self._detail_cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= ttl:
+            del self._detail_cache[key]
+            return None
+        self._detail_cache.move_to_end(key)
+        return entry[1]
+
+    def _lru_put(self, kind: str, id_: int, value: Dict[str, Any], max_size: int = DETAIL_CACHE_SIZE) -> None:
+        """Store a detail entry, evicting the least recently used beyond max_size"""
+        key = (kind, id_)
+        self._detail_cache[key] = (time.monotonic(), value)
+        self._detail_cache.move_to_end(key)
+        while len(self._detail_cache) > max_size:
+            self._detail_cache.popitem(last=False)
+
+    @ttl_cache(5.0)
     async def get_status(self) -> Dict[str, Any]:
         """
         Get Portainer server status
@@ -44,10 +378,9 @@ class PortainerClient:
         Returns:
             dict: Server status information
         """
-        response = await self.client.get(f"{self.base_url}/status")
-        response.raise_for_status()
-        return response.json()
+        return self._json(_ok(await self.client.get(self._u_status, headers=self._headers)))
 
+    @ttl_cache(30.0, stale_seconds=60.0)
     async def get_endpoints(self) -> List[Dict[str, Any]]:
         """
         Get all Portainer endpoints (environments/servers)
@@ -55,13 +388,11 @@ class PortainerClient:
         Returns:
             list: List of endpoint objects
         """
-        response = await self.client.get(f"{self.base_url}/endpoints")
-        response.raise_for_status()
-        return response.json()
+        return self._json(_ok(await self.client.get(self._u_endpoints, headers=self._headers)))
 
     async def get_endpoint(self, endpoint_id: int) -> Dict[str, Any]:
         """
-        Get specific endpoint details
+        Get specific endpoint details (cached for ENDPOINT_DETAIL_TTL seconds)
 
         Args:
             endpoint_id: ID of the endpoint
@@ -69,10 +400,15 @@ class PortainerClient:
         Returns:
             dict: Endpoint details
         """
-        response = await self.client.get(f"{self.base_url}/endpoints/{endpoint_id}")
-        response.raise_for_status()
-        return response.json()
+        endpoint = self._lru_get("endpoint", endpoint_id, ENDPOINT_DETAIL_TTL)
+        if endpoint is not None:
+            return endpoint
 
+        endpoint = self._json(_ok(await self.client.get(self._u_ep % endpoint_id, headers=self._headers)))
+        self._lru_put("endpoint", endpoint_id, endpoint)
+        return endpoint
+
+    @ttl_cache(60.0, stale_seconds=300.0)
     async def get_custom_templates(self) -> List[Dict[str, Any]]:
         """
         Get all custom templates
@@ -80,57 +416,35 @@ class PortainerClient:
         Returns:
             list: List of custom template objects
         """
-        response = await self.client.get(f"{self.base_url}/custom_templates")
-        response.raise_for_status()
-        return response.json()
+        return self._json(_ok(await self.client.get(self._u_tmpls, headers=self._headers)))
 
-    async def get_custom_template(self, template_id: int) -> Dict[str, Any]:
+    @ttl_cache(60.0)
+    async def get_custom_template(self, template_id: int, include_vars: bool = False) -> Dict[str, Any]:
         """
         Get specific custom template details
-        Enriches template with variables from App Template format if present
+        Optionally enriches template with variables from App Template format if present
 
         Args:
             template_id: ID of the template
+            include_vars: Also fetch and parse the template file for variables
 
         Returns:
-            dict: Template details including variables
+            dict: Template details (including variables if include_vars)
         """
-        import json
+        response = _ok(await self.client.get(self._u_tmpl % template_id, headers=self._headers))
+        template = self._json(response)
 
-        response = await self.client.get(f"{self.base_url}/custom_templates/{template_id}")
-        response.raise_for_status()
-        template = response.json()
+        if not include_vars:
+            return template
 
         # Try to parse file content for App Template format variables
         try:
-            file_response = await self.client.get(f"{self.base_url}/custom_templates/{template_id}/file")
-            file_response.raise_for_status()
-            file_data = file_response.json()
-            file_content = file_data.get("FileContent", "")
-
-            # Parse as App Template JSON
-            parsed = json.loads(file_content)
-            if isinstance(parsed, list) and len(parsed) > 0:
-                app_template = parsed[0]
-                if "env" in app_template and isinstance(app_template["env"], list):
-                    # Convert App Template env format to Portainer Variables format
-                    variables = []
-                    for env_var in app_template["env"]:
-                        var = {
-                            "name": env_var.get("name", ""),
-                            "label": env_var.get("label", env_var.get("name", "")),
-                            "description": env_var.get("description", ""),
-                            "default": env_var.get("default", "")
-                        }
-                        # Add select options if present
-                        if "select" in env_var:
-                            var["select"] = env_var["select"]
-                        variables.append(var)
-
-                    # Replace empty Variables array with parsed variables
-                    template["Variables"] = variables
+            template_file = await self._get_template_file_data(template_id)
+            if template_file["variables"] is not None:
+                # Replace empty Variables array with parsed variables
+                template["Variables"] = template_file["variables"]
         except Exception:
-            # If parsing fails, keep original template unchanged
+            # If fetching fails, keep original template unchanged
             pass
 
         return template
@@ -146,27 +460,61 @@ class PortainerClient:
         Returns:
             str: File content of the template (docker-compose.yml)
         """
-        import json
+        template_file = await self._get_template_file_data(template_id)
+        return template_file["stackfile"]
 
-        response = await self.client.get(f"{self.base_url}/custom_templates/{template_id}/file")
-        response.raise_for_status()
-        data = response.json()
-        file_content = data.get("FileContent", "")
+    async def _get_template_file_data(self, template_id: int) -> Dict[str, Any]:
+        """
+        Fetch and parse a custom template file, cached for TEMPLATE_CACHE_TTL seconds
+
+        Args:
+            template_id: ID of the template
+
+        Returns:
+            dict: {"stackfile": compose file content,
+                   "variables": App Template variables or None}
+        """
+        entry = self._tpl_cache.get(template_id)
+        if entry and time.monotonic() - entry[0] < TEMPLATE_CACHE_TTL:
+            return entry[1]
+
+        response = _ok(await self.client.get(self._u_tmpl_file % template_id, headers=self._headers))
+        file_content = self._json(response).get("FileContent", "")
+        template_file = {"stackfile": file_content, "variables": None}
 
         # Try to parse as App Template JSON format
         try:
-            parsed = json.loads(file_content)
+            parsed = orjson.loads(file_content)
             if isinstance(parsed, list) and len(parsed) > 0:
+                app_template = parsed[0]
+
                 # App Template format: extract stackfile from repository
-                template_data = parsed[0]
-                if "repository" in template_data and "stackfile" in template_data["repository"]:
-                    return template_data["repository"]["stackfile"]
-        except (json.JSONDecodeError, KeyError, IndexError):
-            # Not App Template format, return as-is (plain docker-compose.yml)
+                if "repository" in app_template and "stackfile" in app_template["repository"]:
+                    template_file["stackfile"] = app_template["repository"]["stackfile"]
+
+                if "env" in app_template and isinstance(app_template["env"], list):
+                    # Convert App Template env format to Portainer Variables format
+                    variables = []
+                    for env_var in app_template["env"]:
+                        var = {
+                            "name": env_var.get("name", ""),
+                            "label": env_var.get("label", env_var.get("name", "")),
+                            "description": env_var.get("description", ""),
+                            "default": env_var.get("default", "")
+                        }
+                        # Add select options if present
+                        if "select" in env_var:
+                            var["select"] = env_var["select"]
+                        variables.append(var)
+                    template_file["variables"] = variables
+        except (orjson.JSONDecodeError, KeyError, IndexError, TypeError, AttributeError):
+            # Not App Template format, use as-is (plain docker-compose.yml)
             pass
 
-        return file_content
+        self._tpl_cache[template_id] = (time.monotonic(), template_file)
+        return template_file
 
+    @ttl_cache(5.0, stale_seconds=30.0)
     async def get_stacks(self) -> List[Dict[str, Any]]:
         """
         Get all stacks across all endpoints
@@ -174,13 +522,40 @@ class PortainerClient:
         Returns:
             list: List of stack objects
         """
-        response = await self.client.get(f"{self.base_url}/stacks")
-        response.raise_for_status()
-        return response.json()
+        return self._json(_ok(await self.client.get(self._u_stacks, headers=self._headers)))
+
+    @ttl_cache(5.0)
+    async def get_stacks_by_endpoint(self, endpoint_id: int) -> List[Dict[str, Any]]:
+        """
+        Get stacks deployed on a specific endpoint (filtered by Portainer)
+
+        Args:
+            endpoint_id: ID of the endpoint
+
+        Returns:
+            list: List of stack objects on that endpoint
+        """
+        return self._json(_ok(await self.client.get(
+            self._u_stacks,
+            params={"filters": orjson.dumps({"EndpointID": endpoint_id}).decode()},
+            headers=self._headers
+        )))
+
+    async def get_stacks_grouped(self) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Get all stacks grouped by endpoint in a single pass
+
+        Returns:
+            dict: endpoint_id -> list of stack objects
+        """
+        grouped: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for stack in await self.get_stacks():
+            grouped[stack.get("EndpointId")].append(stack)
+        return dict(grouped)
 
     async def get_stack(self, stack_id: int) -> Dict[str, Any]:
         """
-        Get specific stack details
+        Get specific stack details (cached for STACK_DETAIL_TTL seconds)
 
         Args:
             stack_id: ID of the stack
@@ -188,9 +563,13 @@ class PortainerClient:
         Returns:
             dict: Stack details
         """
-        response = await self.client.get(f"{self.base_url}/stacks/{stack_id}")
-        response.raise_for_status()
-        return response.json()
+        stack = self._lru_get("stack", stack_id, STACK_DETAIL_TTL)
+        if stack is not None:
+            return stack
+
+        stack = self._json(_ok(await self.client.get(self._u_stack % stack_id, headers=self._headers)))
+        self._lru_put("stack", stack_id, stack)
+        return stack
 
     async def deploy_stack_from_template(
         self,
@@ -211,28 +590,36 @@ class PortainerClient:
         Returns:
             dict: Created stack details
         """
-        # Get the template file content
-        file_content = await self.get_custom_template_file(template_id)
-
-        # Get endpoint details to check if it's Swarm
-        endpoint = await self.get_endpoint(endpoint_id)
+        # Get the template file content and endpoint details (to check if it's Swarm)
+        # concurrently; the template file is usually already cached by the UI's view
+        file_content, endpoint = await asyncio.gather(
+            self.get_custom_template_file(template_id),
+            self.get_endpoint(endpoint_id)
+        )
         is_swarm = endpoint.get("Snapshots", [{}])[0].get("Swarm", False) if endpoint.get("Snapshots") else False
 
         # Prepare environment variables in correct format and perform variable substitution
-        env_list = []
-        host_path = None
-
         if env_vars:
-            for env_var in env_vars:
-                if isinstance(env_var, dict) and "name" in env_var and "value" in env_var:
-                    env_list.append({"name": env_var["name"], "value": env_var["value"]})
-                    # Replace {{VARIABLE_NAME}} placeholders in file content
-                    placeholder = "{{" + env_var["name"] + "}}"
-                    file_content = file_content.replace(placeholder, env_var["value"])
+            env_list = [
+                {"name": env_var["name"], "value": env_var["value"]}
+                for env_var in env_vars
+                if isinstance(env_var, dict) and "name" in env_var and "value" in env_var
+            ]
+            mapping = {env_var["name"]: env_var["value"] for env_var in env_list}
+        else:
+            # Shared read-only list; only ever serialized, never mutated
+            env_list = _EMPTY_ENV
+            mapping = {}
 
-                    # Capture HOST_PATH for directory pre-creation
-                    if env_var["name"] == "HOST_PATH":
-                        host_path = env_var["value"]
+        # Replace {{VARIABLE_NAME}} placeholders in a single pass over the file
+        if mapping:
+            file_content = PLACEHOLDER_PATTERN.sub(
+                lambda m: mapping.get(m.group(1), m.group(0)),
+                file_content
+            )
+
+        # Capture HOST_PATH for directory pre-creation
+        host_path = mapping.get("HOST_PATH")
 
         # Pre-create HOST_PATH directory with correct ownership if specified
         if host_path:
@@ -247,13 +634,22 @@ class PortainerClient:
 
         # Deploy based on whether endpoint is Swarm or standalone Docker
         if is_swarm:
-            url = f"{self.base_url}/stacks/create/swarm/string?endpointId={endpoint_id}"
+            url = self._u_deploy_swarm % endpoint_id
         else:
-            url = f"{self.base_url}/stacks/create/standalone/string?endpointId={endpoint_id}"
+            url = self._u_deploy_compose % endpoint_id
 
-        response = await self.client.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
+        response = _ok(await self.client.post(
+            url,
+            content=orjson.dumps(payload),
+            headers=self._json_headers
+        ))
+        self.invalidate("get_stack")
+
+        # Seed the detail cache so the UI's follow-up lookup skips a round-trip
+        stack = self._json(response)
+        if isinstance(stack, dict) and "Id" in stack:
+            self._lru_put("stack", stack["Id"], stack)
+        return stack
 
     async def _ensure_host_directory(self, endpoint_id: int, host_path: str) -> None:
         """
@@ -303,16 +699,16 @@ class PortainerClient:
             }
 
             # Create and start container via Docker API through Portainer
-            create_url = f"{self.base_url}/endpoints/{endpoint_id}/docker/containers/create"
-            response = await self.client.post(create_url, json=container_payload)
+            create_url = self._u_ep_container_create % endpoint_id
+            response = await self.client.post(create_url, json=container_payload, headers=self._headers)
 
             if response.status_code == 201:
-                container_data = response.json()
+                container_data = self._json(response)
                 container_id = container_data["Id"]
 
                 # Start the container
-                start_url = f"{self.base_url}/endpoints/{endpoint_id}/docker/containers/{container_id}/start"
-                await self.client.post(start_url)
+                start_url = self._u_ep_container_start % (endpoint_id, container_id)
+                await self.client.post(start_url, headers=self._headers)
 
                 # Container will auto-remove after completion
                 # Wait a moment for it to complete
@@ -336,10 +732,12 @@ class PortainerClient:
         Returns:
             bool: True if successful
         """
-        response = await self.client.delete(
-            f"{self.base_url}/stacks/{stack_id}?endpointId={endpoint_id}"
-        )
-        response.raise_for_status()
+        _ok(await self.client.delete(
+            self._u_stack_on_ep % (stack_id, endpoint_id),
+            headers=self._headers
+        ))
+        self.invalidate("get_stack")
+        self._detail_cache.pop(("stack", stack_id), None)
         return True
 
     async def get_endpoint_containers(self, endpoint_id: int) -> List[Dict[str, Any]]:
@@ -352,46 +750,180 @@ class PortainerClient:
         Returns:
             list: List of container objects
         """
-        response = await self.client.get(
-            f"{self.base_url}/endpoints/{endpoint_id}/docker/containers/json?all=true"
+        return self._json(_ok(await self.client.get(
+            self._u_ep_containers % endpoint_id,
+            headers=self._headers
+        )))
+
+    async def get_endpoint_containers_slim(self, endpoint_id: int) -> Dict[str, List[str]]:
+        """
+        Get the containers on an endpoint as parallel lists of the fields the UI shows
+
+        Args:
+            endpoint_id: ID of the endpoint
+
+        Returns:
+            dict: {"ids", "names", "states", "images"}, one entry per container
+        """
+        containers = await self.get_endpoint_containers(endpoint_id)
+        return {
+            "ids": [c["Id"] for c in containers],
+            "names": [c["Names"][0] if c.get("Names") else "" for c in containers],
+            "states": [c.get("State", "") for c in containers],
+            "images": [c.get("Image", "") for c in containers],
+        }
+
+    async def _limited(self, coro: Awaitable[Any]) -> Any:
+        """Run a fan-out request under the concurrency semaphore"""
+        async with self._fanout:
+            return await coro
+
+    async def get_all_endpoint_containers(self, endpoint_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Get containers for several endpoints concurrently
+
+        Args:
+            endpoint_ids: IDs of the endpoints
+
+        Returns:
+            dict: endpoint_id -> list of container objects (failed endpoints omitted)
+        """
+        results = await asyncio.gather(
+            *(self._limited(self.get_endpoint_containers(eid)) for eid in endpoint_ids),
+            return_exceptions=True
         )
-        response.raise_for_status()
-        return response.json()
+        return {
+            eid: result for eid, result in zip(endpoint_ids, results)
+            if not isinstance(result, Exception)
+        }
+
+    async def snapshot_all(self) -> List[Dict[str, Any]]:
+        """
+        Get all endpoints together with their containers
+        Container lists are fetched concurrently across endpoints
+
+        Returns:
+            list: [{"endpoint": {...}, "containers": [...], "error": None}, ...]
+                  containers is None and error is set if that endpoint failed
+        """
+        endpoints = await self.get_endpoints()
+        results = await asyncio.gather(
+            *(self._limited(self.get_endpoint_containers(endpoint["Id"])) for endpoint in endpoints),
+            return_exceptions=True
+        )
+
+        snapshot = []
+        for endpoint, result in zip(endpoints, results):
+            if isinstance(result, Exception):
+                snapshot.append({"endpoint": endpoint, "containers": None, "error": str(result)})
+            else:
+                snapshot.append({"endpoint": endpoint, "containers": result, "error": None})
+        return snapshot
+
+    async def refresh_dashboard(self) -> DashboardSnapshot:
+        """
+        Fetch status, endpoints, stacks and templates concurrently
+        (multiplexed over the pooled HTTP/2 connection)
+
+        Returns:
+            DashboardSnapshot: Per-call results or exceptions
+        """
+        status, endpoints, stacks, templates = await asyncio.gather(
+            self.get_status(),
+            self.get_endpoints(),
+            self.get_stacks(),
+            self.get_custom_templates(),
+            return_exceptions=True
+        )
+        return DashboardSnapshot(status, endpoints, stacks, templates)
 
     async def health_check(self) -> bool:
         """
         Check if Portainer API is accessible
+        Uses a HEAD request with a short timeout and caches the result briefly
 
         Returns:
             bool: True if accessible, False otherwise
         """
+        now = time.monotonic()
+        if now - self._last_health_ts < HEALTH_CACHE_TTL:
+            return self._last_health
+
+        # Bypass the response cache: its failure fallback would mask an outage
         try:
-            await self.get_status()
-            return True
+            response = await self.client.head(self._u_status, headers=self._headers, timeout=2.0)
+            self._last_health = response.status_code < 500
         except Exception:
-            return False
+            self._last_health = False
+        self._last_health_ts = now
+        return self._last_health
 
 
-# Singleton instance
+# Process-wide default instance, set at startup
 _portainer_client: Optional[PortainerClient] = None
 
+# Per-context override (e.g. a tenant-specific client for one request).
+# Not used for the default: values set in the startup hook are not
+# inherited by request tasks, so the default must stay module-level.
+_portainer_client_var: ContextVar[Optional[PortainerClient]] = ContextVar("portainer_client", default=None)
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(fn: Callable[[], Awaitable[Any]]) -> Optional[asyncio.Task]:
+    """Schedule fn() on the running loop, if any"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    task = loop.create_task(fn())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 
 def get_portainer_client() -> Optional[PortainerClient]:
-    """Get the global Portainer client instance"""
-    return _portainer_client
+    """Get the Portainer client for the current context (override or global default)"""
+    return _portainer_client_var.get() or _portainer_client
+
+
+@contextmanager
+def use_portainer_client(client: PortainerClient) -> Iterator[PortainerClient]:
+    """
+    Override the Portainer client returned by get_portainer_client() within a context
+
+    Args:
+        client: Client to use for the duration of the context
+    """
+    token = _portainer_client_var.set(client)
+    try:
+        yield client
+    finally:
+        _portainer_client_var.reset(token)
 
 
-def init_portainer_client(url: str, api_key: str) -> PortainerClient:
+def init_portainer_client(url: str, api_key: str, max_connections: int = 1000) -> PortainerClient:
     """
     Initialize the global Portainer client
+    Closes the previous client's connections if one was already initialized
 
     Args:
         url: Portainer server URL
         api_key: API access token
+        max_connections: Connection pool ceiling for concurrent requests
 
     Returns:
         PortainerClient: Initialized client
     """
     global _portainer_client
-    _portainer_client = PortainerClient(url, api_key)
+    previous = _portainer_client
+    _portainer_client = PortainerClient(url, api_key, max_connections=max_connections)
+
+    if previous is not None:
+        _spawn(previous.close)
+
+    # Establish the connection eagerly when called from a running event loop
+    _portainer_client._prewarm_task = _spawn(_portainer_client.prewarm)
+
     return _portainer_client
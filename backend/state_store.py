@@ -0,0 +1,201 @@
+"""
+Monitoring State Store
+Holds the prebuilt per-server JSON blobs served by the polling endpoints
+"""
+
+from typing import List, Dict, Optional, Tuple
+
+
+class MemoryStore:
+    """In-process store (single worker, lost on restart)"""
+
+    def __init__(self):
+        # Column layout keyed by server alias: one float compare plus
+        # bytes appends per server on the read path
+        self.alias_order: List[str] = []
+        self.received_ts: Dict[str, float] = {}
+        self.columns: Dict[str, Dict[str, bytes]] = {}
+
+    async def save(self, alias: str, ts: float, blobs: Dict[str, bytes]) -> None:
+        """
+        Store the blobs of a server report
+
+        Args:
+            alias: Server alias
+            ts: Epoch timestamp the report was received at
+            blobs: Field name -> prebuilt JSON bytes
+        """
+        if alias not in self.received_ts:
+            self.alias_order.append(alias)
+
+        # No await between these writes, so readers never see a partial update
+        self.received_ts[alias] = ts
+        for field, blob in blobs.items():
+            self.columns.setdefault(field, {})[alias] = blob
+
+    async def delete(self, alias: str) -> bool:
+        """
+        Remove a server
+
+        Args:
+            alias: Server alias
+
+        Returns:
+            bool: True if the server existed
+        """
+        if alias not in self.received_ts:
+            return False
+
+        del self.received_ts[alias]
+        self.alias_order.remove(alias)
+        for column in self.columns.values():
+            column.pop(alias, None)
+        return True
+
+    async def count(self) -> int:
+        """Number of servers stored"""
+        return len(self.alias_order)
+
+    async def get(self, alias: str, field: str) -> Optional[bytes]:
+        """Get a single blob for a server, or None if missing"""
+        return self.columns.get(field, {}).get(alias)
+
+    async def select(
+        self,
+        fresh: Tuple[str, ...],
+        stale: Tuple[str, ...],
+        now: float,
+        threshold: float
+    ) -> List[bytes]:
+        """
+        Collect blobs for every server in insertion order
+
+        Args:
+            fresh: Fields to emit for servers reported within threshold
+            stale: Fields to emit for servers older than threshold
+            now: Current epoch timestamp
+            threshold: Staleness threshold in seconds
+
+        Returns:
+            list: Non-empty blobs, in server order
+        """
+        fresh_columns = [self.columns.get(field, {}) for field in fresh]
+        stale_columns = [self.columns.get(field, {}) for field in stale]
+        blobs = []
+
+        for alias in self.alias_order:
+            columns = stale_columns if now - self.received_ts[alias] > threshold else fresh_columns
+            for column in columns:
+                blob = column.get(alias)
+                if blob:
+                    blobs.append(blob)
+
+        return blobs
+
+
+class RedisStore:
+    """Redis-backed store shared by all workers"""
+
+    def __init__(self, redis, prefix: str, record_ttl: int):
+        """
+        Initialize Redis store
+
+        Args:
+            redis: redis.asyncio client
+            prefix: Key prefix (records live at {prefix}:srv:{alias})
+            record_ttl: Seconds after which a silent server's record expires
+        """
+        self.redis = redis
+        self.prefix = prefix
+        self.record_ttl = record_ttl
+        # Sorted by first-seen time so results keep a stable order
+        self.index_key = f"{prefix}:srv:index"
+
+    def _key(self, alias: str) -> str:
+        return f"{self.prefix}:srv:{alias}"
+
+    async def save(self, alias: str, ts: float, blobs: Dict[str, bytes]) -> None:
+        """
+        Store the blobs of a server report
+
+        Args:
+            alias: Server alias
+            ts: Epoch timestamp the report was received at
+            blobs: Field name -> prebuilt JSON bytes
+        """
+        key = self._key(alias)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"ts": ts, **blobs})
+        pipe.expire(key, self.record_ttl)
+        pipe.zadd(self.index_key, {alias: ts}, nx=True)
+        await pipe.execute()
+
+    async def delete(self, alias: str) -> bool:
+        """
+        Remove a server
+
+        Args:
+            alias: Server alias
+
+        Returns:
+            bool: True if the server existed
+        """
+        pipe = self.redis.pipeline()
+        pipe.delete(self._key(alias))
+        pipe.zrem(self.index_key, alias)
+        deleted, _ = await pipe.execute()
+        return bool(deleted)
+
+    async def count(self) -> int:
+        """Number of servers stored (including expired ones not yet pruned)"""
+        return await self.redis.zcard(self.index_key)
+
+    async def get(self, alias: str, field: str) -> Optional[bytes]:
+        """Get a single blob for a server, or None if missing"""
+        return await self.redis.hget(self._key(alias), field)
+
+    async def select(
+        self,
+        fresh: Tuple[str, ...],
+        stale: Tuple[str, ...],
+        now: float,
+        threshold: float
+    ) -> List[bytes]:
+        """
+        Collect blobs for every server in first-seen order
+
+        Args:
+            fresh: Fields to emit for servers reported within threshold
+            stale: Fields to emit for servers older than threshold
+            now: Current epoch timestamp
+            threshold: Staleness threshold in seconds
+
+        Returns:
+            list: Non-empty blobs, in server order
+        """
+        aliases = await self.redis.zrange(self.index_key, 0, -1)
+        if not aliases:
+            return []
+
+        fields = ("ts",) + fresh + stale
+        pipe = self.redis.pipeline()
+        for alias in aliases:
+            pipe.hmget(self._key(alias.decode()), fields)
+        rows = await pipe.execute()
+
+        blobs = []
+        expired = []
+        split = 1 + len(fresh)
+        for alias, row in zip(aliases, rows):
+            if row[0] is None:
+                # Record expired; prune it from the index
+                expired.append(alias)
+                continue
+            values = row[split:] if now - float(row[0]) > threshold else row[1:split]
+            blobs.extend(blob for blob in values if blob)
+
+        if expired:
+            await self.redis.zrem(self.index_key, *expired)
+
+        return blobs
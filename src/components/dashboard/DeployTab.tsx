@@ -118,7 +118,7 @@ export function DeployTab() {
 
   const loadTemplateDetails = async (templateId: number) => {
     try {
-      const details = await fetchPortainerTemplate(templateId);
+      const details = await fetchPortainerTemplate(templateId, true);
       setTemplateDetails(details);
 
       // Initialize env vars with defaults
@@ -1,4 +1,4 @@
-import { ServerStatus, Machine, Container, PortainerEndpoint, PortainerTemplate, PortainerStack, DeployStackRequest } from "@/types/server";
+import { ServerStatus, Machine, Container, PortainerEndpoint, PortainerEndpointOverview, PortainerEndpointContainers, PortainerTemplate, PortainerStack, DeployStackRequest } from "@/types/server";
 
 // Backend API endpoint - change this to your backend URL
 const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:3200/api";
@@ -184,6 +184,20 @@ export async function fetchPortainerEndpoints(): Promise<PortainerEndpoint[]> {
   return data.endpoints;
 }
 
+export async function fetchPortainerEndpointContainers(endpointId: number): Promise<PortainerEndpointContainers> {
+  const response = await fetch(`${API_BASE}/portainer/endpoints/${endpointId}/containers`);
+  if (!response.ok) throw new Error("Failed to fetch containers");
+  return await response.json();
+}
+
+// Endpoints with their containers, fetched concurrently by the backend
+export async function fetchPortainerOverview(): Promise<PortainerEndpointOverview[]> {
+  const response = await fetch(`${API_BASE}/portainer/overview`);
+  if (!response.ok) throw new Error("Failed to fetch overview");
+  const data = await response.json();
+  return data.overview;
+}
+
 export async function fetchPortainerTemplates(): Promise<PortainerTemplate[]> {
   const response = await fetch(`${API_BASE}/portainer/templates`);
   if (!response.ok) throw new Error("Failed to fetch templates");
@@ -191,8 +205,9 @@ export async function fetchPortainerTemplates(): Promise<PortainerTemplate[]> {
   return data.templates;
 }
 
-export async function fetchPortainerTemplate(templateId: number): Promise<PortainerTemplate> {
-  const response = await fetch(`${API_BASE}/portainer/templates/${templateId}`);
+// includeVars also parses the template file for its variables (deploy form only)
+export async function fetchPortainerTemplate(templateId: number, includeVars = false): Promise<PortainerTemplate> {
+  const response = await fetch(`${API_BASE}/portainer/templates/${templateId}?include_vars=${includeVars}`);
   if (!response.ok) throw new Error("Failed to fetch template");
   return await response.json();
 }
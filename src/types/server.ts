@@ -103,6 +103,20 @@ export interface PortainerEndpoint {
   TagIds: number[];
 }
 
+export interface PortainerEndpointOverview {
+  endpoint: PortainerEndpoint;
+  containers: any[] | null;
+  error: string | null;
+}
+
+// Parallel lists: index i of each describes the same container
+export interface PortainerEndpointContainers {
+  ids: string[];
+  names: string[];
+  states: string[];
+  images: string[];
+}
+
 export interface PortainerTemplate {
   Id: number;
   Title: string;